@@ -24,6 +24,7 @@ from qcodes.instrument.base import Instrument
 from qcodes.instrument.parameter import Parameter, ArrayParameter
 import nidaqmx
 from nidaqmx.constants import AcquisitionType, TaskMode
+from nidaqmx.stream_readers import AnalogMultiChannelReader
 from typing import Dict, Optional, Sequence, Any, Union
 import numpy as np
 
@@ -46,13 +47,17 @@ class DAQAnalogInputVoltages(ArrayParameter):
         self.nchannels, self.target_points = shape
         self.samples_to_read = samples_to_read
         self.timeout = timeout
+        #: Samples are read directly into this buffer, which is reused for every acquisition
+        self._buffer = np.empty((self.nchannels, samples_to_read), dtype=np.float64)
+        self._reader = AnalogMultiChannelReader(task.in_stream)
         
     def get_raw(self):
         """Averages data to get `self.target_points` points per channel.
         If `self.target_points` == `self.samples_to_read`, no averaging is done.
         """
-        data_raw = np.array(self.task.read(number_of_samples_per_channel=self.samples_to_read, timeout=self.timeout))
-        return np.mean(np.reshape(data_raw, (self.nchannels, self.target_points, -1)), 2)
+        self._reader.read_many_sample(self._buffer, number_of_samples_per_channel=self.samples_to_read,
+                                      timeout=self.timeout)
+        return np.mean(np.reshape(self._buffer, (self.nchannels, self.target_points, -1)), 2)
     
 class DAQAnalogInputs(Instrument):
     """Instrument to acquire DAQ analog input data in a qcodes Loop or measurement.
@@ -60,7 +65,8 @@ class DAQAnalogInputs(Instrument):
     def __init__(self, name: str, dev_name: str, rate: Union[int, float], channels: Dict[str, int],
                  task: Any, min_val: Optional[float]=-5, max_val: Optional[float]=5,
                  clock_src: Optional[str]=None, samples_to_read: Optional[int]=2,
-                 target_points: Optional[int]=None, timeout: Optional[Union[float, int]]=60, **kwargs) -> None:
+                 target_points: Optional[int]=None, timeout: Optional[Union[float, int]]=60,
+                 close_task: bool=False, **kwargs) -> None:
         """
         Args:
             name: Name of instrument (usually 'daq_ai').
@@ -77,9 +83,12 @@ class DAQAnalogInputs(Instrument):
             target_points: Number of points per channel we want in our final array.
                 samples_to_read will be averaged down to target_points.
             timeout: Acquisition timeout in seconds. Default: 60.
+            close_task: If True, task is closed when this instrument is closed
+                (e.g. by qc.Instrument.close_all()). Default: False.
             **kwargs: Keyword arguments to be passed to Instrument constructor.
         """
         super().__init__(name, **kwargs)
+        self._close_task = close_task
         if target_points is None:
             if samples_to_read == 2: #: minimum number of samples DAQ will read in this timing mode
                 target_points = 1
@@ -122,6 +131,16 @@ class DAQAnalogInputs(Instrument):
             unit='V'
         ) 
         
+    def close(self):
+        """Close the instrument, and its task if it was created with close_task=True.
+        """
+        if getattr(self, '_close_task', False):
+            try:
+                self.task.close()
+            except nidaqmx.errors.DaqError:
+                pass
+        super().close()
+
     def clear_instances(self):
         """Clear instances of DAQAnalogInputs Instruments.
         """
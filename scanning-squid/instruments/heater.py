@@ -26,6 +26,10 @@ import qcodes.utils.validators as vals
 import numpy as np
 import visa
 import time
+import re
+
+#: Numeric value in a response, e.g. '12.00' in 'V 12.00'
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
 
 class EL320P(VisaInstrument):
     """Qcodes driver for AIM & Thurlby Thandar EL320P power supply.
@@ -92,8 +96,28 @@ class EL320P(VisaInstrument):
             )
         self.connect_message()
 
-    def _get_parser(self, response):
-        return float(response[2:])
+    @staticmethod
+    def _get_parser(response):
+        match = _NUMBER.search(response)
+        if match is None:
+            raise ValueError('No numeric value in response: {!r}'.format(response))
+        return float(match.group())
+
+    @staticmethod
+    def parse_many(responses: Sequence[str]) -> np.ndarray:
+        """Parses many voltage/current responses (e.g. logged during a ramp) at once.
+
+        Args:
+            responses: Responses to V?, VO?, I? or IO? queries.
+
+        Returns:
+            np.ndarray: values
+                Array of the numeric values in responses, one per response.
+
+        Raises:
+            ValueError if a response doesn't contain a numeric value.
+        """
+        return np.array([EL320P._get_parser(r) for r in responses], dtype=np.float64)
 
     def _output_parser(self, response):
         return response[4:]
@@ -55,12 +55,8 @@ from .micropscope import Microscope
 
 #: Pint for manipulating physical units
 from pint import UnitRegistry
-ureg = UnitRegistry()
 #: Tell UnitRegistry instance what a Phi0 is, and that Ohm = ohm
-with open('squid_units.txt', 'w') as f:
-    f.write('Phi0 = 2.067833831e-15 * Wb\n')
-    f.write('Ohm = ohm\n')
-ureg.load_definitions('./squid_units.txt')
+ureg = utils.define_squid_units(UnitRegistry())
 
 import logging
 log = logging.getLogger(__name__)
@@ -22,22 +22,20 @@
 
 #: Various Python utilities
 import os
-import sys
+import pickle
 import time
 import json
 import pathlib
 from typing import Dict, List, Sequence, Any, Union, Tuple
 from collections import OrderedDict
 
-#: Plotting and math modules
-import matplotlib.pyplot as plt
-import mpl_toolkits.mplot3d.axes3d as axes3d
-import matplotlib.colors as colors
+#: Math modules
+#: (matplotlib, plots, and IPython are slow to import, so they are only
+#: imported by the methods that use them)
 import numpy as np
 from scipy.linalg import lstsq
 from scipy.interpolate import Rbf
 from scipy import io
-from IPython.display import clear_output
 
 #: Qcodes for running measurements and saving data
 import qcodes as qc
@@ -55,22 +53,42 @@ import instruments.atto as atto
 import utils
 from scanner import Scanner
 from instruments.daq import DAQAnalogInputs
-from plots import ScanPlot, TDCPlot
 from instruments.lakeshore import Model_372, Model_331
 from instruments.heater import EL320P
 
 #: Pint for manipulating physical units
 from pint import UnitRegistry
-ureg = UnitRegistry()
 #: Tell UnitRegistry instance what a Phi0 is, and that Ohm = ohm
-with open('squid_units.txt', 'w') as f:
-    f.write('Phi0 = 2.067833831e-15 * Wb\n')
-    f.write('Ohm = ohm\n')
-ureg.load_definitions('./squid_units.txt')
+ureg = utils.define_squid_units(UnitRegistry())
 
 import logging
 log = logging.getLogger(__name__)
 
+#: Pickled microscope configuration files, keyed by (absolute path, modification time)
+_CONFIG_CACHE: Dict[Tuple[str, int], bytes] = {}
+
+def _load_config(config_file: str) -> OrderedDict:
+    """Loads a microscope configuration file, reusing the previously parsed
+    contents if the file has not been modified since it was last loaded.
+
+    Args:
+        config_file: Path to microscope configuration JSON file.
+
+    Returns:
+        OrderedDict: config
+            Copy of the parsed configuration file.
+    """
+    path = os.path.abspath(config_file)
+    key = (path, os.stat(path).st_mtime_ns)
+    if key not in _CONFIG_CACHE:
+        #: Forget older versions of the same file
+        for stale in [k for k in _CONFIG_CACHE if k[0] == path]:
+            del _CONFIG_CACHE[stale]
+        _CONFIG_CACHE[key] = pickle.dumps(utils.load_json_ordered(path), pickle.HIGHEST_PROTOCOL)
+    #: Instruments keep references into (and modify) their configs, e.g. scanner.metadata['plane'],
+    #: so each load needs a fresh copy. Unpickling is faster than both parsing the JSON and deepcopy.
+    return pickle.loads(_CONFIG_CACHE[key])
+
 
 class Microscope(Station):
     """Base class for scanning SQUID microscope.
@@ -90,7 +108,14 @@ class Microscope(Station):
         """
         super().__init__(**kwargs)
         qc.Instrument.close_all()
-        self.config = utils.load_json_ordered(config_file)
+        self.config = _load_config(config_file)
+        #: Sub-configurations used when adding instruments
+        self._atto_cfg = self.config['instruments']['atto']
+        self._scanner_cfg = self.config['instruments']['scanner']
+        self._daq_cfg = self.config['instruments']['daq']
+        self._squid_cfg = self.config['SQUID']
+        #: {channel_name: ai_index} for all DAQ analog inputs
+        self._ai_channels = dict(self._daq_cfg['channels']['analog_inputs'])
         if not os.path.exists('logs'):
             os.mkdir('logs')
         if log_name is None:
@@ -106,11 +131,14 @@ class Microscope(Station):
                 logging.StreamHandler()
             ])
         log.info('Logging started.')
-        log.info('Initializing microscope object using file {}.'.format(config_file))
+        log.info('Initializing microscope object using file %s.', config_file)
 
         self.ureg = ureg
         # Callable for converting a string into a quantity with units
         self.Q_ = ureg.Quantity
+        #: Memoized conversions of config strings, e.g. '1 MHz', to Quantities/magnitudes
+        self._q_cache: Dict[Any, Any] = {}
+        self._conv_cache: Dict[Tuple[Any, str], float] = {}
         self.temp = temp
 
         self._add_atto()
@@ -120,10 +148,42 @@ class Microscope(Station):
         self._add_SQUID()
         self._add_lockins()
 
+    def _to_quantity(self, value: Any) -> Any:
+        """Convert a string (or number) from a configuration dict into a pint Quantity,
+        parsing each distinct value only once.
+
+        Args:
+            value: Value to convert, e.g. '1 MHz'.
+        Returns:
+            pint.Quantity: quantity
+        """
+        q = self._q_cache.get(value)
+        if q is None:
+            q = self.Q_(value)
+            self._q_cache[value] = q
+        return q
+
+    def _to_mag(self, value: Any, unit: str) -> float:
+        """Magnitude of a string (or number) from a configuration dict in the given unit,
+        computing each distinct (value, unit) conversion only once.
+
+        Args:
+            value: Value to convert, e.g. '1 MHz'.
+            unit: Unit in which to express value, e.g. 'Hz'.
+        Returns:
+            float: magnitude
+        """
+        key = (value, unit)
+        mag = self._conv_cache.get(key)
+        if mag is None:
+            mag = self._to_quantity(value).to(unit).magnitude
+            self._conv_cache[key] = mag
+        return mag
+
     def _add_atto(self):
         """Add Attocube controller to microscope.
         """
-        atto_config = self.config['instruments']['atto']
+        atto_config = self._atto_cfg
         ts_fmt = self.config['info']['timestamp_format']
         if hasattr(self, 'atto'):
         #     self.atto.clear_instances()
@@ -160,28 +220,36 @@ class Microscope(Station):
     def _add_scanner(self):
         """Add scanner instrument to microscope.
         """
-        scanner_config = self.config['instruments']['scanner']
-        daq_config = self.config['instruments']['daq']
+        scanner_config = self._scanner_cfg
+        daq_config = self._daq_cfg
         if hasattr(self, 'scanner'):
             #self.scanner.clear_instances()
             self.scanner.close()
         self.remove_component(scanner_config['name'])
         self.scanner = Scanner(scanner_config, daq_config, self.temp, self.ureg)
         self.add_component(self.scanner)
+        #: Parsed once here rather than every time prefactors are calculated
+        self._cap_calibration = None
+        if 'cantilever' in scanner_config:
+            self._cap_calibration = self._to_quantity(scanner_config['cantilever']['calibration'])
         log.info('Scanner successfully added to microscope.')
     
     def _add_SQUID(self):
         """Add SQUID instrument to microscope.
         """
-        squid_config = self.config['SQUID']
+        squid_config = self._squid_cfg
         if hasattr(self, 'SQUID'):
             #self.SQUID.clear_instances()
             self.SQUID.close()
         self.remove_component(squid_config['name'])
-        squid_type = squid_config['type'].lower().capitalize()
-        self.SQUID = getattr(sys.modules['squids'], squid_type)(squid_config)
+        squid_class = squids.REGISTRY[squid_config['type'].lower()]
+        self.SQUID = squid_class(squid_config)
         self.add_component(self.SQUID)
-        log.info('{}(SQUID) successfully added to microscope.'.format(squid_type))
+        #: Parsed once here rather than every time prefactors are calculated
+        self._mod_width = None
+        if 'modulation_width' in squid_config:
+            self._mod_width = self._to_quantity(squid_config['modulation_width'])
+        log.info('%s(SQUID) successfully added to microscope.', squid_class.__name__)
         
     def _add_lockins(self):
         """Add lockins to microscope.
@@ -196,7 +264,7 @@ class Microscope(Station):
             instr = SR830(name, address, metadata={lockin: lockin_info})
             setattr(self, name, instr)
             self.add_component(getattr(self, '{}_lockin'.format(lockin)))
-            log.info('{} successfully added to microscope.'.format(name))
+            log.info('%s successfully added to microscope.', name)
             
     def set_lockins(self, measurement: Dict[str, Any]) -> None:
         """Initialize lockins for given measurement.
@@ -209,12 +277,12 @@ class Microscope(Station):
         for ch in channels:
             if 'lockin' in channels[ch]:
                 lockin = '{}_lockin'.format(channels[ch]['lockin']['name'])
+                parameters = getattr(self, lockin).parameters
                 for param in channels[ch]['lockin']:
                     if param != 'name':
-                        parameters = getattr(self, lockin).parameters
                         unit = parameters[param].unit
-                        value = self.Q_(channels[ch]['lockin'][param]).to(unit).magnitude
-                        log.info('Setting {} on {} to {} {}.'.format(param, lockin, value, unit))
+                        value = self._to_mag(channels[ch]['lockin'][param], unit)
+                        log.info('Setting %s on %s to %s %s.', param, lockin, value, unit)
                         parameters[param].set(value)
         time.sleep(1)
 
@@ -230,23 +298,17 @@ class Microscope(Station):
             Tuple[qcodes.DataSet, plots.TDCPlot]: data, tdc_plot
                 DataSet and plot generated by the touchdown Loop.
         """
+        from plots import TDCPlot
         old_pos = self.scanner.position()
         constants = tdc_params['constants']
-        daq_config = self.config['instruments']['daq']
+        daq_config = self._daq_cfg
         daq_name = daq_config['name']
-        ai_channels = daq_config['channels']['analog_inputs']
         meas_channels = tdc_params['channels']
-        channels = {} 
-        for ch in meas_channels:
-            channels.update({ch: ai_channels[ch]})
-        nchannels = len(channels.keys())
-        daq_rate = self.Q_(daq_config['rate']).to('Hz').magnitude / nchannels
+        channels = {ch: self._ai_channels[ch] for ch in meas_channels}
+        nchannels = len(channels)
+        daq_rate = self._to_mag(daq_config['rate'], 'Hz') / nchannels
         self.set_lockins(tdc_params)
         self.snapshot(update=update_snap)
-        #: z position voltage step
-        dV = self.Q_(tdc_params['dV']).to('V').magnitude
-        #: Start and end z position voltages
-        startV, endV = sorted([self.Q_(lim).to('V').magnitude for lim in tdc_params['range']])
         delay = constants['wait_factor'] * max(self.CAP_lockin.time_constant(), self.SUSC_lockin.time_constant())
         prefactors = self.get_prefactors(tdc_params)
         #: get channel prefactors in string form so they can be saved in metadata
@@ -254,7 +316,7 @@ class Microscope(Station):
         for ch, prefac in prefactors.items():
             unit = tdc_params['channels'][ch]['unit']
             pre = prefac.to('{}/V'.format(unit))
-            prefactor_strs.update({ch: '{} {}'.format(pre.magnitude, pre.units)})
+            prefactor_strs[ch] = '{} {}'.format(pre.magnitude, pre.units)
         ai_task =  nidaqmx.Task('td_cap_ai_task')
         self.remove_component('daq_ai')
         if hasattr(self, 'daq_ai'):
@@ -262,10 +324,11 @@ class Microscope(Station):
             self.daq_ai.close()
         self.daq_ai = DAQAnalogInputs('daq_ai', daq_name, daq_rate, channels, ai_task)
         loop_counter = utils.Counter()
-        tdc_plot = TDCPlot(tdc_params, self.ureg) 
-        loop = qc.Loop(self.scanner.position_z.sweep(startV, endV, dV)
+        tdc_plot = TDCPlot(tdc_params, self.ureg)
+        #: Sweep exactly the z positions the plot and touchdown detection index into.
+        #: Points are still acquired one at a time so that check_for_td can stop the sweep.
+        loop = qc.Loop(self.scanner.position_z[tdc_plot.heights.tolist()], delay=delay
             ).each(
-                qc.Task(time.sleep, delay),
                 self.daq_ai.voltage,
                 qc.Task(self.scanner.check_for_td, tdc_plot, qc.loops.active_data_set, loop_counter),
                 qc.Task(self.scanner.get_td_height, tdc_plot),
@@ -284,7 +347,7 @@ class Microscope(Station):
         loop.metadata.update(tdc_params)
         loop.metadata.update({'prefactors': prefactor_strs})
         for idx, ch in enumerate(meas_channels):
-            loop.metadata['channels'][ch].update({'idx': idx})
+            loop.metadata['channels'][ch]['idx'] = idx
         data = loop.get_data_set(name=tdc_params['fname'], write_period=None)
         try:
             log.info('Starting capacitive touchdown.')
@@ -294,7 +357,7 @@ class Microscope(Station):
                 if abs(old_pos[0]) < 0.01 and abs(old_pos[1]) < 0.01:
                     self.scanner.metadata['plane'].update({'z': self.scanner.td_height})
         except KeyboardInterrupt:
-            log.warning('Touchdown interrupted by user. Retracting scanner. DataSet saved to {}.'.format(data.location))
+            log.warning('Touchdown interrupted by user. Retracting scanner. DataSet saved to %s.', data.location)
             #: Set break_loop = True so that get_plane() and approach() will be aborted
             self.scanner.break_loop = True
         finally:
@@ -319,6 +382,8 @@ class Microscope(Station):
                 in measurement configuration file.
             attosteps: Number of z atto steps to perform per iteration. Default 100.
         """
+        import matplotlib.pyplot as plt
+        from IPython.display import clear_output
         self.snapshot(update=True)
         log.info('Attempting to approach sample.')
         #: Perform an initial touchdown to make sure we're not close to the sample.
@@ -348,6 +413,10 @@ class Microscope(Station):
             tdc_params: Dict of capacitive touchdown parameters as defined
                 in measurement configuration file.
         """
+        import matplotlib.pyplot as plt
+        #: Registers the '3d' projection used below
+        import mpl_toolkits.mplot3d.axes3d as axes3d
+        from IPython.display import clear_output
         old_pos = self.scanner.position()
         #: True if touchdown doesn't occur for any point in the grid
         out_of_range = False
@@ -418,12 +487,12 @@ class Microscope(Station):
             td = np.reshape(td_grid, (-1, 1))
             z = np.column_stack((x, y, np.ones_like(x)))
             plane, res, _, _ = lstsq(z, td)
-            log.info('New plane : {}.'.format([plane[i][0] for i in range(3)]))
+            log.info('New plane : %s.', [plane[i][0] for i in range(3)])
             ax0.plot_surface(x_grid, y_grid, plane[0] * x_grid + plane[1] * y_grid + plane[2],
                 cmap='viridis', alpha=0.5)
             ax1.plot_surface(x_grid, y_grid, self.scanner.surface_interp(x_grid, y_grid),  cmap='viridis', alpha=0.5)
             for i, axis in enumerate(['x', 'y', 'z']):
-                self.scanner.metadata['plane'].update({axis: plane[i][0]})
+                self.scanner.metadata['plane'][axis] = plane[i][0]
             self.atto.surface_is_current = True
             loc_provider = qc.FormatLocation(fmt='./data/{date}/#{counter}_{name}_{time}')
             loc = loc_provider(DiskIO('.'), record={'name': 'surface'})
@@ -449,7 +518,7 @@ class Microscope(Station):
         """
         if name in self.components:
             _ = self.components.pop(name)
-            log.info('Removed {} from microscope.'.format(name))
+            log.info('Removed %s from microscope.', name)
         else:
-            log.debug('Microscope has no component with the name {}'.format(name))  
+            log.debug('Microscope has no component with the name %s', name)  
             
@@ -44,16 +44,12 @@ from instruments.daq import DAQAnalogInputs
 from instruments.dg645 import DG645
 from instruments.afg3000 import AFG3000
 from .microscope import Microscope
-from utils import Counter, clear_artists
+from utils import Counter, clear_artists, define_squid_units
 
 #: Pint for manipulating physical units
 from pint import UnitRegistry
-ureg = UnitRegistry()
 #: Tell UnitRegistry instance what a Phi0 is, and that Ohm = ohm
-with open('squid_units.txt', 'w') as f:
-    f.write('Phi0 = 2.067833831e-15 * Wb\n')
-    f.write('Ohm = ohm\n')
-ureg.load_definitions('./squid_units.txt')
+ureg = define_squid_units(UnitRegistry())
 
 import logging
 log = logging.getLogger(__name__)
@@ -276,12 +272,9 @@ class SamplerMicroscope(Microscope):
 
         data_dict = {}
         meta_dict = {}
-        daq_config = self.config['instruments']['daq']
-        ai_channels = daq_config['channels']['analog_inputs']
+        daq_config = self._daq_cfg
         meas_channels = ivm_params['channels']
-        channels = {}
-        for ch in meas_channels:
-            channels.update({ch: ai_channels[ch]})
+        channels = {ch: self._ai_channels[ch] for ch in meas_channels}
 
         vmod = self.Q_(ivm_params['vmod_initial']).to('V').magnitude
         vcomp_set = self.Q_(ivm_params['vcomp_set']).to('V').magnitude
@@ -32,18 +32,13 @@ from nidaqmx.constants import AcquisitionType
 
 #: scanning-squid modules
 from instruments.daq import DAQAnalogInputs
-from plots import ScanPlot
 from .microscope import Microscope
 import utils
 
 #: Pint for manipulating physical units
 from pint import UnitRegistry
-ureg = UnitRegistry()
 #: Tell UnitRegistry instance what a Phi0 is, and that Ohm = ohm
-with open('squid_units.txt', 'w') as f:
-    f.write('Phi0 = 2.067833831e-15 * Wb\n')
-    f.write('Ohm = ohm\n')
-ureg.load_definitions('./squid_units.txt')
+ureg = utils.define_squid_units(UnitRegistry())
 
 import logging
 log = logging.getLogger(__name__)
@@ -65,6 +60,16 @@ class SusceptometerMicroscope(Microscope):
             **kwargs: Keyword arguments to be passed to Station constructor.
         """
         super().__init__(config_file, temp, ureg, log_level, log_name, **kwargs)
+        #: Calculates the prefactor (before gain) for each channel in get_prefactors
+        self._prefactor_builders = {
+            'MAG': self._pf_mag,
+            'SUSCX': self._pf_susc,
+            'SUSCY': self._pf_susc,
+            'CAP': self._pf_cap
+        }
+        #: (configuration, ai_task, daq_ai) from the last scan, reused by the next scan
+        #: if its AI configuration is the same. daq_ai closes ai_task when it is closed.
+        self._scan_ai = None
 
     def get_prefactors(self, measurement: Dict[str, Any], update: bool=True) -> Dict[str, Any]:
         """For each channel, calculate prefactors to convert DAQ voltage into real units.
@@ -78,28 +83,66 @@ class SusceptometerMicroscope(Microscope):
             Dict[str, pint.Quantity]: prefactors
                 Dict of {channel_name: prefactor} where prefactor is a pint Quantity.
         """
-        mod_width = self.Q_(self.SQUID.metadata['modulation_width'])
+        channels = measurement['channels']
+        #: SUSCX and SUSCY share a lockin, so query each lockin at most once
+        susc_snap = None
+        if any(ch in ['SUSCX', 'SUSCY'] for ch in channels):
+            susc_snap = self.SUSC_lockin.snapshot(update=update)['parameters']
+        cap_snap = None
+        if 'CAP' in channels:
+            cap_snap = self.CAP_lockin.snapshot(update=update)['parameters']
         prefactors = {}
-        for ch in measurement['channels']:
-            prefactor = 1
-            if ch == 'MAG':
-                prefactor /= mod_width
-            elif ch in ['SUSCX', 'SUSCY']:
-                r_lead = self.Q_(measurement['channels'][ch]['r_lead'])
-                snap = getattr(self, 'SUSC_lockin').snapshot(update=update)['parameters']
-                susc_sensitivity = snap['sensitivity']['value']
-                amp = snap['amplitude']['value'] * self.ureg(snap['amplitude']['unit'])
-                #: The factor of 10 here is because SR830 output gain is 10/sensitivity
-                prefactor *=  (r_lead / amp) / (mod_width * 10 / susc_sensitivity)
-            elif ch == 'CAP':
-                snap = getattr(self, 'CAP_lockin').snapshot(update=update)['parameters']
-                cap_sensitivity = snap['sensitivity']['value']
-                #: The factor of 10 here is because SR830 output gain is 10/sensitivity
-                prefactor /= (self.Q_(self.scanner.metadata['cantilever']['calibration']) * 10 / cap_sensitivity)
-            prefactor /= measurement['channels'][ch]['gain']
-            prefactors.update({ch: prefactor.to('{}/V'.format(measurement['channels'][ch]['unit']))})
+        for ch in channels:
+            ch_meta = channels[ch]
+            prefactor = self._prefactor_builders[ch](ch_meta, susc_snap, cap_snap) / ch_meta['gain']
+            prefactors[ch] = prefactor.to('{}/V'.format(ch_meta['unit']))
         return prefactors
 
+    def _pf_mag(self, ch_meta: Dict[str, Any], susc_snap: Dict[str, Any],
+                cap_snap: Dict[str, Any]) -> Any:
+        """MAG prefactor, not including gain.
+
+        Args:
+            ch_meta: Channel parameters as defined in measurement configuration file.
+            susc_snap: SUSC_lockin parameter snapshot (unused).
+            cap_snap: CAP_lockin parameter snapshot (unused).
+        Returns:
+            pint.Quantity: prefactor
+        """
+        return 1 / self._mod_width
+
+    def _pf_susc(self, ch_meta: Dict[str, Any], susc_snap: Dict[str, Any],
+                 cap_snap: Dict[str, Any]) -> Any:
+        """SUSCX/SUSCY prefactor, not including gain.
+
+        Args:
+            ch_meta: Channel parameters as defined in measurement configuration file.
+            susc_snap: SUSC_lockin parameter snapshot.
+            cap_snap: CAP_lockin parameter snapshot (unused).
+        Returns:
+            pint.Quantity: prefactor
+        """
+        r_lead = self._to_quantity(ch_meta['r_lead'])
+        susc_sensitivity = susc_snap['sensitivity']['value']
+        amp = susc_snap['amplitude']['value'] * self._to_quantity(susc_snap['amplitude']['unit'])
+        #: The factor of 10 here is because SR830 output gain is 10/sensitivity
+        return (r_lead / amp) / (self._mod_width * 10 / susc_sensitivity)
+
+    def _pf_cap(self, ch_meta: Dict[str, Any], susc_snap: Dict[str, Any],
+                cap_snap: Dict[str, Any]) -> Any:
+        """CAP prefactor, not including gain.
+
+        Args:
+            ch_meta: Channel parameters as defined in measurement configuration file.
+            susc_snap: SUSC_lockin parameter snapshot (unused).
+            cap_snap: CAP_lockin parameter snapshot.
+        Returns:
+            pint.Quantity: prefactor
+        """
+        cap_sensitivity = cap_snap['sensitivity']['value']
+        #: The factor of 10 here is because SR830 output gain is 10/sensitivity
+        return 1 / (self._cap_calibration * 10 / cap_sensitivity)
+
     def scan_surface(self, scan_params: Dict[str, Any]) -> None:
         """
         Scan the current surface while acquiring data in the channels defined in
@@ -111,6 +154,8 @@ class SusceptometerMicroscope(Microscope):
         Returns:
             None
         """
+        #: Only import matplotlib when it's needed
+        from plots import ScanPlot
         if not self.atto.surface_is_current:
             raise RuntimeError('Surface is not current. Aborting scan.')
         surface_type = scan_params['surface_type'].lower()
@@ -119,28 +164,25 @@ class SusceptometerMicroscope(Microscope):
 
         old_pos = self.scanner.position()
         
-        daq_config = self.config['instruments']['daq']
+        daq_config = self._daq_cfg
         ao_channels = daq_config['channels']['analog_outputs']
-        ai_channels = daq_config['channels']['analog_inputs']
         meas_channels = scan_params['channels']
-        channels = {}
-        for ch in meas_channels:
-            channels.update({ch: ai_channels[ch]})
-        nchannels = len(channels.keys())
+        channels = {ch: self._ai_channels[ch] for ch in meas_channels}
+        nchannels = len(channels)
 
         daq_name = daq_config['name']
         #: DAQ AI sampling rate is divided amongst all active AI channels
-        daq_rate = self.Q_(daq_config['rate']).to('Hz').magnitude / nchannels
+        daq_rate = self._to_mag(daq_config['rate'], 'Hz') / nchannels
         
         fast_ax = scan_params['fast_ax'].lower()
         slow_ax = 'x' if fast_ax == 'y' else 'y'
         
         pix_per_line = scan_params['scan_size'][fast_ax]
-        line_duration = pix_per_line * self.ureg('pixels') / self.Q_(scan_params['scan_rate'])
+        line_duration = pix_per_line * self.ureg('pixels') / self._to_quantity(scan_params['scan_rate'])
         pts_per_line = int(daq_rate * line_duration.to('s').magnitude)
-        height = self.Q_(scan_params['height']).to('V').magnitude
+        height = self._to_mag(scan_params['height'], 'V')
         
-        if 1 / self.Q_(scan_params['scan_rate']).to('pixels/s').magnitude < self.SUSC_lockin.time_constant():
+        if 1 / self._to_mag(scan_params['scan_rate'], 'pixels/s') < self.SUSC_lockin.time_constant():
             warning = 'Averaging time per pixel is less than the SUSC_lockin time constant. '
             warning += 'For reliable susceptibility data, averaging time per pixel should be '
             warning += 'significantly greater than the SUSC_lockin time constant.'
@@ -167,16 +209,9 @@ class SusceptometerMicroscope(Microscope):
         for ch, prefac in prefactors.items():
             unit = scan_params['channels'][ch]['unit']
             pre = prefac.to('{}/V'.format(unit))
-            prefactor_strs.update({ch: '{} {}'.format(pre.magnitude, pre.units)})
-        ai_task = nidaqmx.Task('scan_plane_ai_task')
+            prefactor_strs[ch] = '{} {}'.format(pre.magnitude, pre.units)
         self.remove_component('daq_ai')
-        if hasattr(self, 'daq_ai'):
-            #self.daq_ai.clear_instances()
-            self.daq_ai.close()
-        self.daq_ai = DAQAnalogInputs('daq_ai', daq_name, daq_rate, channels, ai_task,
-                                      samples_to_read=pts_per_line, target_points=pix_per_line,
-                                      #: Very important to synchronize AOs and AIs
-                                      clock_src='ao/SampleClock')
+        ai_task = self._get_scan_ai(daq_name, daq_rate, channels, pts_per_line, pix_per_line)
         self.add_component(self.daq_ai)
         slow_ax_position = getattr(self.scanner, 'position_{}'.format(slow_ax))
         slow_ax_start = scan_vectors[slow_ax][0]
@@ -184,35 +219,24 @@ class SusceptometerMicroscope(Microscope):
         slow_ax_step = scan_vectors[slow_ax][1] - scan_vectors[slow_ax][0]
         #: There is probably a counter built in to qc.Loop, but I couldn't find it
         loop_counter = utils.Counter()
-        scan_plot = ScanPlot(scan_params, self.ureg)
+        #: Saving the plot is slow compared to a fast line, so save at most every 10 seconds
+        #: during the scan, and once more when the scan is done.
+        scan_plot = ScanPlot(scan_params, self.ureg, save_interval=10)
         loop = qc.Loop(slow_ax_position.sweep(start=slow_ax_start,
                                               stop=slow_ax_end,
                                               step=slow_ax_step), delay=0.1
         ).each(
-            #: Create AO task and queue data to be written to AOs
-            qc.Task(self.scanner.scan_line, scan_grids, ao_channels, daq_rate, loop_counter),
-            #: Start AI task; acquisition won't start until AO task is started
-            qc.Task(ai_task.start),
-            #: Start AO task
-            qc.Task(self.scanner.control_ao_task, 'start'),
+            #: Queue the line on the scanner AOs and start the AO and AI tasks
+            qc.Task(self._start_scan_line, scan_grids, ao_channels, daq_rate, loop_counter, ai_task),
             #: Acquire voltage from all active AI channels
             self.daq_ai.voltage,
-            qc.Task(ai_task.wait_until_done),
-            qc.Task(self.scanner.control_ao_task, 'wait_until_done'),
-            qc.Task(ai_task.stop),
-            #: Stop and close AO task so that AOs can be used for goto
-            qc.Task(self.scanner.control_ao_task, 'stop'),
-            qc.Task(self.scanner.control_ao_task, 'close'),
-            qc.Task(self.scanner.goto_start_of_next_line, scan_grids, loop_counter),
-            #: Update and save plot
-            qc.Task(scan_plot.update, qc.loops.active_data_set, loop_counter),
-            qc.Task(scan_plot.save),
-            qc.Task(loop_counter.advance)
+            #: Stop the tasks, move to the next line, and update the plot
+            qc.Task(self._finish_scan_line, scan_grids, loop_counter, ai_task, scan_plot)
         ).then(
+            #: ai_task and daq_ai are kept open for the next scan
             qc.Task(ai_task.stop),
-            qc.Task(ai_task.close),
-            qc.Task(self.daq_ai.close),
-            #qc.Task(self.daq_ai.clear_instances),
+            qc.Task(self.scanner.finalize_scan),
+            qc.Task(scan_plot.save, force=True),
             qc.Task(self.scanner.goto, old_pos),
             #qc.Task(self.CAP_lockin.amplitude, 0.004),
             #qc.Task(self.SUSC_lockin.amplitude, 0.004)
@@ -221,29 +245,127 @@ class SusceptometerMicroscope(Microscope):
         loop.metadata.update(scan_params)
         loop.metadata.update({'prefactors': prefactor_strs})
         for idx, ch in enumerate(meas_channels):
-            loop.metadata['channels'][ch].update({'idx': idx})
+            loop.metadata['channels'][ch]['idx'] = idx
         data = loop.get_data_set(name=scan_params['fname'])
         #: Run the loop
         try:
+            #: Creates the scan AO task and stacks the grids; released by finalize_scan() below
+            self.scanner.prepare_scan(scan_grids, ao_channels, daq_rate)
             loop.run()
             log.info('Scan completed. DataSet saved to {}.'.format(data.location))
         #: If loop is aborted by user:
         except KeyboardInterrupt:
             log.warning('Scan aborted by user. Going to [0,0,0] V. DataSet saved to {}.'.format(data.location))
+            #: .then() doesn't run when the loop is aborted, and the last save() may have been
+            #: skipped by save_interval, so save the lines acquired so far.
+            if getattr(scan_plot, 'location', None) is not None:
+                scan_plot.save(force=True)
         finally:
             try:
-                #: Stop 'scan_plane_ai_task' so that we can read our current position
+                #: Stop the AI task so that we can read our current position
                 ai_task.stop()
-                ai_task.close()
-                #: If there's an active AO task, close it so that we can use goto
-                self.scanner.control_ao_task('stop')
-                self.scanner.control_ao_task('close')
-                self.remove_component('daq_ai')
             except:
                 pass
+            #: If there's an active AO task, close it so that we can use goto.
+            #: The scanner keeps a reference to its own AO task, so check that
+            #: rather than querying DAQmx for every task on the system.
+            try:
+                if self.scanner.ao_task is not None:
+                    self.scanner.control_ao_task('stop')
+            finally:
+                #: Also releases the stacked grids if prepare_scan() failed partway
+                self.scanner.finalize_scan()
+            self.remove_component('daq_ai')
         self.scanner.goto([0, 0, 0])
         #self.CAP_lockin.amplitude(0.004)
         #self.SUSC_lockin.amplitude(0.004)
         utils.scan_to_mat_file(data, real_units=True, interpolator=self.scanner.surface_interp)
         #return data, scan_plot
+
+    def _get_scan_ai(self, daq_name: str, daq_rate: Union[int, float], channels: Dict[str, int],
+                     pts_per_line: int, pix_per_line: int) -> Any:
+        """Sets self.daq_ai for a scan and returns its AI task. The task from the previous scan
+        is reused if it has the same configuration, rather than creating and configuring a new one.
+
+        Args:
+            daq_name: NI DAQ device name (e.g. 'Dev1').
+            daq_rate: DAQ sampling rate per channel in Hz.
+            channels: Dict of {channel_name: ai_index} for the measurement channels.
+            pts_per_line: Number of samples per channel acquired per line.
+            pix_per_line: Number of pixels per line (pts_per_line is averaged down to this).
+        Returns:
+            nidaqmx.Task: ai_task
+        """
+        config = (daq_name, daq_rate, tuple(channels.items()), pts_per_line, pix_per_line)
+        if self._scan_ai is not None:
+            last_config, ai_task, daq_ai = self._scan_ai
+            #: daq_ai (and with it ai_task) is closed by, e.g., td_cap or qc.Instrument.close_all()
+            if config == last_config and daq_ai in DAQAnalogInputs.instances():
+                self.daq_ai = daq_ai
+                return ai_task
+            self._close_scan_ai()
+        if hasattr(self, 'daq_ai') and self.daq_ai in DAQAnalogInputs.instances():
+            self.daq_ai.close()
+        #: Unnamed, because the task outlives this scan and DAQmx task names must be unique
+        ai_task = nidaqmx.Task()
+        self.daq_ai = DAQAnalogInputs('daq_ai', daq_name, daq_rate, channels, ai_task,
+                                      samples_to_read=pts_per_line, target_points=pix_per_line,
+                                      #: Very important to synchronize AOs and AIs
+                                      clock_src='ao/SampleClock',
+                                      #: So the task doesn't outlive daq_ai, e.g. on re-init
+                                      close_task=True)
+        self._scan_ai = (config, ai_task, self.daq_ai)
+        return ai_task
+
+    def _close_scan_ai(self) -> None:
+        """Close the AI task and DAQAnalogInputs kept open from the last scan.
+        """
+        if self._scan_ai is None:
+            return
+        _, _, daq_ai = self._scan_ai
+        self._scan_ai = None
+        #: Otherwise daq_ai has already been closed, and ai_task along with it
+        if daq_ai in DAQAnalogInputs.instances():
+            daq_ai.close()
+
+    def _start_scan_line(self, scan_grids: Dict[str, Any], ao_channels: Dict[str, int],
+                         daq_rate: Union[int, float], loop_counter: Any, ai_task: Any) -> None:
+        """Queues the current line of a scan on the scanner AOs and starts acquisition.
+        Called as a single qcodes Task before each line is acquired in scan_surface.
+
+        Args:
+            scan_grids: Dict of {axis_name: axis_meshgrid} from utils.make_scan_grids().
+            ao_channels: Dict of {axis_name: ao_index} for the scanner ao channels.
+            daq_rate: DAQ sampling rate in Hz.
+            loop_counter: utils.Counter instance, determines current line of the grid.
+            ai_task: nidaqmx.Task used by self.daq_ai.
+        """
+        #: Create AO task (if necessary) and queue data to be written to AOs
+        self.scanner.scan_line(scan_grids, ao_channels, daq_rate, loop_counter)
+        #: Start AI task; acquisition won't start until AO task is started
+        ai_task.start()
+        self.scanner.control_ao_task('start')
+
+    def _finish_scan_line(self, scan_grids: Dict[str, Any], loop_counter: Any, ai_task: Any,
+                          scan_plot: Any) -> None:
+        """Stops acquisition, moves to the start of the next line, and updates the ScanPlot.
+        Called as a single qcodes Task after each line is acquired in scan_surface.
+
+        Args:
+            scan_grids: Dict of {axis_name: axis_meshgrid} from utils.make_scan_grids().
+            loop_counter: utils.Counter instance, determines current line of the grid.
+            ai_task: nidaqmx.Task used by self.daq_ai.
+            scan_plot: plots.ScanPlot instance for the current scan.
+        """
+        ai_task.wait_until_done()
+        self.scanner.control_ao_task('wait_until_done')
+        ai_task.stop()
+        #: Stop and unreserve AO task so that AOs can be used for goto.
+        #: The task is reused for the next line and closed once the scan is done.
+        self.scanner.control_ao_task('stop')
+        self.scanner.goto_start_of_next_line(scan_grids, loop_counter)
+        #: Update and save plot
+        scan_plot.update(qc.loops.active_data_set(), loop_counter)
+        scan_plot.save()
+        loop_counter.advance()
         
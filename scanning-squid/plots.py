@@ -21,11 +21,13 @@
 # THE SOFTWARE.
 
 import os
+import time
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import matplotlib.colors as colors
 import numpy as np
-from utils import make_scan_vectors, make_scan_grids, moving_avg, to_real_units, clear_artists
+from utils import make_scan_vectors, make_scan_grids, make_td_heights, moving_avg, to_real_units, clear_artists
+from utils import define_squid_units
 from typing import Dict, List, Optional, Sequence, Any, Union, Tuple
 import warnings
 warnings.filterwarnings('ignore', message='The unit of the quantity is stripped.')
@@ -33,15 +35,21 @@ warnings.filterwarnings('ignore', message='The unit of the quantity is stripped.
 class ScanPlot(object):
     """Plot displaying acquired images in all measurement channels, updated live during a scan.
     """
-    def __init__(self,  scan_params: Dict[str, Any], ureg: Any, **kwargs) -> None:
+    def __init__(self,  scan_params: Dict[str, Any], ureg: Any, save_interval: float=0,
+                 **kwargs) -> None:
         """
         Args:
             scan_params: Scan parameters as defined in measurement configuration file.
             prefactors: Dict of pint quantities defining conversion factor from
                 DAQ voltage to real units for each measurement channel.
             ureg: pint UnitRegistry, manages units.
+            save_interval: Minimum time in seconds between saves of the plot. Calls to save()
+                within save_interval of the previous save are skipped unless force=True.
+                Default: 0 (always save).
         """
         self.scan_params = scan_params
+        self.save_interval = save_interval
+        self._last_save = None
         self.ureg = ureg
         self.Q_ = ureg.Quantity
         self.channels = scan_params['channels']
@@ -145,16 +153,22 @@ class ScanPlot(object):
                     self.plots['lines'][ch].plot(xdata, ydata, lw=2, color=self.line_colors[num_lines-l-1])
         self.fig.canvas.draw()
         
-    def save(self, fname=None):
+    def save(self, fname=None, force=False):
         """Save plot to png file.
 
         Args:
             fname: File to which to save the plot.
                 If fname is None, saves to data location as {scan_params['fname']}.png
+            force: If True, saves the plot even if it was saved less than
+                self.save_interval seconds ago. Default: False.
         """
+        if not force and self._last_save is not None:
+            if time.monotonic() - self._last_save < self.save_interval:
+                return
         if fname is None:
             fname = os.path.join(self.location, self.scan_params['fname'] + '.png')
-        plt.savefig(fname, dpi=300)
+        self.fig.savefig(fname, dpi=300)
+        self._last_save = time.monotonic()
             
 class ScanPlotFromDataSet(ScanPlot):
     """Generate ScanPlot instance from a completed DataSet rather than during a Loop.
@@ -167,14 +181,9 @@ class ScanPlotFromDataSet(ScanPlot):
         """
         if ureg is None:
             from pint import UnitRegistry
-            ureg = UnitRegistry()
-            #: Tell the UnitRegistry what a Phi0 is, and that ohm = Ohm
-            with open('squid_units.txt', 'w') as f:
-                f.write('Phi0 = 2.067833831e-15 * Wb\n')
-                f.write('Ohm = ohm\n')
-            ureg.load_definitions('./squid_units.txt')
+            ureg = define_squid_units(UnitRegistry())
         meta = scan_data.metadata['loop']['metadata']
-        super().__init__(meta, meta['prefactors'], ureg)
+        super().__init__(meta, ureg)
         self.update(scan_data, None, offline=True)
 
 class TDCPlot(object):
@@ -198,10 +207,7 @@ class TDCPlot(object):
     def init_empty(self):
         """Initialize the plot with no data.
         """
-        dV = self.Q_(self.tdc_params['dV']).to('V').magnitude
-        startV, endV = sorted([self.Q_(lim).to('V').magnitude for lim in self.tdc_params['range']])
-        npnts = int((endV - startV) / dV)
-        self.heights = np.linspace(startV, endV, npnts)
+        self.heights = make_td_heights(self.tdc_params, self.ureg)
         for i, ch in enumerate(self.channels):
             self.ax[i].set_xlim(min(self.heights), max(self.heights))
             self.ax[i].grid()
@@ -26,12 +26,16 @@ import qcodes.utils.validators as vals
 import utils
 from scipy import io
 from scipy.interpolate import Rbf
-from typing import Dict, List, Optional, Sequence, Any, Union
+from typing import Dict, List, Optional, Sequence, Any, Union, Tuple
 import numpy as np
 import nidaqmx
 from nidaqmx.constants import AcquisitionType, TaskMode
+from nidaqmx.stream_writers import AnalogMultiChannelWriter
 import logging
+import numbers
 log = logging.getLogger(__name__)
+#: Scanner axes, in the order used for positions
+_AXES: Tuple[str, str, str] = ('x', 'y', 'z')
 
 class Scanner(Instrument):
     """Controls DAQ AOs to drive the scanner.
@@ -56,6 +60,21 @@ class Scanner(Instrument):
         self.Q_ = ureg.Quantity
         self.metadata.update(scanner_config)
         self.metadata.update({'daq': daq_config})
+        #: [(axis, physical_channel)] for the scanner AOs, used by goto
+        self._ao_channel_names = [
+            (axis, '{}/ao{}'.format(daq_config['name'], daq_config['channels']['analog_outputs'][axis]))
+            for axis in _AXES]
+        #: AO task used to scan lines, kept open (but stopped) between lines of a scan
+        self.ao_task = None
+        self._ao_task_config = None
+        self._ao_writer = None
+        #: Scan grids stacked by prepare_scan(), shape (lines, ao_channels, points_per_line)
+        self._ao_rows = None
+        self._ao_rows_key = None
+        #: Preallocated (ao_channels, points_per_line) buffer for reversed lines
+        self._scan_line_buf = None
+        #: AI task used by get_pos, created once and reused
+        self._ai_task = None
         self._parse_unitful_quantities()
         self._initialize_parameters()
         self.goto([0, 0, 0])
@@ -72,36 +91,62 @@ class Scanner(Instrument):
                                'LT': {},
                                'unit': self.metadata['voltage_limits']['unit'],
                                'comment': self.metadata['voltage_limits']['comment']}
-        unit = self.voltage_limits['unit']
-        for axis in ['x', 'y', 'z']:
+        #: Parse the unit once, rather than once per limit
+        unit = self.ureg(self.voltage_limits['unit'])
+        for axis in _AXES:
             self.constants.update({axis: self.Q_(self.metadata['constants'][axis])})
             for temp in ['RT', 'LT']:
-                lims = [lim *self.ureg(unit) for lim in sorted(self.metadata['voltage_limits'][temp][axis])]
+                lims = [lim * unit for lim in sorted(self.metadata['voltage_limits'][temp][axis])]
                 self.voltage_limits[temp].update({axis: lims})
+        #: Magnitudes in V and V/s used by goto, retract, etc., so they
+        #: don't have to be converted with pint every time the scanner moves.
+        #: {axis: (min_V, max_V)} for the current temperature mode
+        self._axis_bounds = {}
+        for axis in _AXES:
+            lims_V = [lim.to('V').magnitude for lim in self.voltage_limits[self.temp][axis]]
+            self._axis_bounds[axis] = (min(lims_V), max(lims_V))
+        self._speed_V_s = self.speed.to('V/s').magnitude
+        #: {speed_string: speed in V/s} for speeds passed to goto, retract, etc.
+        self._speed_cache: Dict[str, float] = {}
+        self._v_retract_V = self.voltage_retract[self.temp].to('V').magnitude
+
+    def _speed_to_V_s(self, speed: Optional[Union[str, numbers.Real]]) -> float:
+        """Convert a speed argument of goto, retract, etc. to a float in V/s.
+
+        Args:
+            speed: None (use the default speed), a number in V/s (any real number type,
+                including numpy scalars, but not bool), or a string (e.g. '2 V/s').
+        Returns:
+            float: speed in V/s.
+        """
+        if speed is None:
+            return self._speed_V_s
+        if isinstance(speed, numbers.Real) and not isinstance(speed, bool):
+            return float(speed)
+        if speed not in self._speed_cache:
+            self._speed_cache[speed] = self.Q_(speed).to('V/s').magnitude
+        return self._speed_cache[speed]
                 
     def _initialize_parameters(self):
         """Add parameters to instrument upon initialization.
         """
-        v_limits = []
-        for axis in ['x', 'y', 'z']:
-            lims = self.voltage_limits[self.temp][axis]
-            lims_V = [lim.to('V').magnitude for lim in lims]
-            v_limits += lims_V
+        #: Each element of position must be within the widest bounds of any axis
+        min_V = min(self._axis_bounds[axis][0] for axis in _AXES)
+        max_V = max(self._axis_bounds[axis][1] for axis in _AXES)
         self.add_parameter('position',
                             label='Scanner position',
                             unit='V',
                             vals=vals.Lists(
-                                elt_validator=vals.Numbers(min(v_limits), max(v_limits))),
+                                elt_validator=vals.Numbers(min_V, max_V)),
                             get_cmd=self.get_pos,
                             set_cmd=self.goto
                             )
-        for i, axis in enumerate(['x', 'y', 'z']):
-            lims = self.voltage_limits[self.temp][axis]
-            lims_V = [lim.to('V').magnitude for lim in lims]
+        for i, axis in enumerate(_AXES):
+            min_V, max_V = self._axis_bounds[axis]
             self.add_parameter('position_{}'.format(axis),
                            label='{} position'.format(axis),
                            unit='V',
-                           vals=vals.Numbers(min(lims_V), max(lims_V)),
+                           vals=vals.Numbers(min_V, max_V),
                            get_cmd=(lambda idx=i: self.get_pos()[idx]),
                            set_cmd=getattr(self, '_goto_{}'.format(axis))
                            )
@@ -113,15 +158,29 @@ class Scanner(Instrument):
             numpy.ndarray: pos
                 Array of current [x, y, z] scanner voltage.
         """    
-        with nidaqmx.Task('get_pos_ai_task') as ai_task:
-            for ax in ['x', 'y', 'z']:
-                idx = self.metadata['daq']['channels']['analog_inputs'][ax]
-                channel = self.metadata['daq']['name'] + '/ai{}'.format(idx)
-                ai_task.ai_channels.add_ai_voltage_chan(channel, ax, min_val=-10, max_val=10)
-            pos_raw = list(np.round(ai_task.read(), decimals=3))
+        #: Creating and configuring the task takes much longer than reading three samples,
+        #: so do it once. An on-demand read returns the task to its previous (uncommitted)
+        #: state, so it doesn't reserve the AIs between calls.
+        if self._ai_task is None:
+            ai_task = nidaqmx.Task('get_pos_ai_task')
+            try:
+                for ax in _AXES:
+                    idx = self.metadata['daq']['channels']['analog_inputs'][ax]
+                    channel = self.metadata['daq']['name'] + '/ai{}'.format(idx)
+                    ai_task.ai_channels.add_ai_voltage_chan(channel, ax, min_val=-10, max_val=10)
+            except:
+                ai_task.close()
+                raise
+            self._ai_task = ai_task
+        try:
+            pos_raw = list(np.round(self._ai_task.read(), decimals=3))
+        except nidaqmx.errors.DaqError:
+            #: e.g. the device was reset; build a new task next time.
+            self._close_ai_task()
+            raise
         pos = []
-        for i, ax in enumerate(['x', 'y', 'z']):
-            ax_lim = sorted([lim.to('V').magnitude for lim in self.voltage_limits[self.temp][ax]])
+        for i, ax in enumerate(_AXES):
+            ax_lim = self._axis_bounds[ax]
             if pos_raw[i] < ax_lim[0]:
                 pos.append(ax_lim[0])
             elif pos_raw[i] > ax_lim[1]:
@@ -131,7 +190,7 @@ class Scanner(Instrument):
         return pos
     
     def goto(self, new_pos: List[float], retract_first: Optional[bool]=False,
-             speed: Optional[str]=None, quiet: Optional[bool]=False) -> None:
+             speed: Optional[Union[str, int, float]]=None, quiet: Optional[bool]=False) -> None:
         """Move scanner to given position.
         By default moves all three axes simultaneously, if necessary.
 
@@ -140,61 +199,112 @@ class Scanner(Instrument):
             retract_first: If True, scanner retracts to value determined by self.temp,
                 then moves in the x,y plane, then moves in z to new_pos. Default: False.
             speed: Speed at which to move the scanner (e.g. '2 V/s') in DAQ voltage units.
-                Default set in microscope configuration JSON file.
+                A number is taken to be in V/s. Default set in microscope configuration JSON file.
             quiet: If True, only logs changes in logging.DEBUG mode.
                 (goto is called many times during, e.g., a scan.) Default: False.
         """
         old_pos = self.position()
-        if speed is None:
-            speed = self.speed.to('V/s').magnitude
-        else:
-            speed = self.Q_(speed).to('V/s').magnitude
-        for i, ax in enumerate(['x', 'y', 'z']):
-            ax_lim = sorted([lim.to('V').magnitude for lim in self.voltage_limits[self.temp][ax]])
-            if new_pos[i] < min(ax_lim) or new_pos[i] > max(ax_lim):
+        speed = self._speed_to_V_s(speed)
+        for i, ax in enumerate(_AXES):
+            ax_lim = self._axis_bounds[ax]
+            if new_pos[i] < ax_lim[0] or new_pos[i] > ax_lim[1]:
                 err = 'Requested position is out of range for {} axis. '
                 err += 'Voltage limits are {} V.'
-                raise ValueError(err.format(ax, ax_lim))
+                raise ValueError(err.format(ax, list(ax_lim)))
         if not retract_first:
             ramp = self.make_ramp(old_pos, new_pos, speed)
             with nidaqmx.Task('goto_ao_task') as ao_task:
-                for axis in ['x', 'y', 'z']:
-                    idx = self.metadata['daq']['channels']['analog_outputs'][axis]
-                    channel = self.metadata['daq']['name'] + '/ao{}'.format(idx)
+                for axis, channel in self._ao_channel_names:
                     ao_task.ao_channels.add_ao_voltage_chan(channel, axis)
                 ao_task.timing.cfg_samp_clk_timing(self.daq_rate, samps_per_chan=len(ramp[0]))
-                pts = ao_task.write(ramp, auto_start=False)
+                #: make_ramp returns a C-contiguous float64 array, as the stream writer requires
+                writer = AnalogMultiChannelWriter(ao_task.out_stream, auto_start=False)
+                pts = writer.write_many_sample(ramp)
                 ao_task.start()
                 ao_task.wait_until_done()
-                log.debug('Wrote {} samples to {}.'.format(pts, ao_task.channel_names))
+                log.debug('Wrote %s samples to %s.', pts, ao_task.channel_names)
         else:
+            #: Each goto below ends where it was told to, so there's no need to read
+            #: the position between moves.
             self.retract(speed=speed)
-            cur_pos = self.get_pos()
-            self.goto([new_pos[0], new_pos[1], cur_pos[2]], speed=speed)
-            cur_pos = self.get_pos()
-            self.goto([cur_pos[0], cur_pos[1], new_pos[2]], speed=speed)
-        current_pos = self.position()
+            self.goto([new_pos[0], new_pos[1], self._v_retract_V], speed=speed)
+            self.goto(new_pos, speed=speed)
+        #: The ramp ends at new_pos, so don't read the position back from the DAQ.
+        current_pos = list(new_pos)
         if quiet:
-            log.debug('Moved scanner from {} V to {} V.'.format(old_pos, current_pos))
+            log.debug('Moved scanner from %s V to %s V.', old_pos, current_pos)
         else:
-             log.info('Moved scanner from {} V to {} V.'.format(old_pos, current_pos))
+             log.info('Moved scanner from %s V to %s V.', old_pos, current_pos)
             
-    def retract(self, speed: Optional[str]=None, quiet: Optional[bool]=False) -> None:
+    def retract(self, speed: Optional[Union[str, int, float]]=None, quiet: Optional[bool]=False) -> None:
         """Retracts z-bender fully based on whether temp is LT or RT.
 
         Args:
                 speed: Speed at which to move the scanner (e.g. '2 V/s') in DAQ voltage units.
-                    Default set in microscope configuration JSON file.
+                    A number is taken to be in V/s. Default set in microscope configuration JSON file.
         """
-        if speed is None:
-            speed = self.speed.to('V/s').magnitude
-        else:
-            speed = self.Q_(speed).to('V/s').magnitude
         current_pos = self.position()
-        v_retract = self.Q_(self.voltage_retract[self.temp]).to('V').magnitude
-        self.goto([current_pos[0], current_pos[1], v_retract],
-            speed='{} V/s'.format(speed), quiet=quiet)
+        self.goto([current_pos[0], current_pos[1], self._v_retract_V],
+            speed=self._speed_to_V_s(speed), quiet=quiet)
     
+    def prepare_scan(self, scan_grids: Dict[str, np.ndarray], ao_channels: Dict[str, int],
+                     daq_rate: Optional[Union[int, float]]=None) -> None:
+        """Stack the scan grids once before a scan, so that scan_line() can write each line
+        to the DAQ AOs without building a new array, and create the AO task used to scan every line.
+        Call finalize_scan() when the scan is done.
+
+        Args:
+            scan_grids: Dict of {axis_name: axis_meshgrid} from utils.make_scan_grids().
+            ao_channels: Dict of {axis_name: ao_index} for the scanner ao channels.
+            daq_rate: DAQ sampling rate in Hz. If None, the AO task is created by the first
+                call to scan_line(). Default: None.
+        """
+        #: Shape (lines, ao_channels, points_per_line), C-contiguous float64,
+        #: so self._ao_rows[line] is a contiguous block in the order nidaqmx expects.
+        self._ao_rows = np.stack([scan_grids[axis] for axis in ao_channels], axis=1).astype(
+            np.float64, order='C', copy=False)
+        #: Keep a reference to scan_grids (rather than its id) so it can't be recycled.
+        self._ao_rows_key = (scan_grids, tuple(ao_channels))
+        self._scan_line_buf = np.empty(self._ao_rows.shape[1:], dtype=np.float64, order='C')
+        if daq_rate is not None:
+            self._setup_ao_task(ao_channels, daq_rate, self._ao_rows.shape[2])
+
+    def finalize_scan(self) -> None:
+        """Close the AO task used to scan lines and release the stacked scan grids.
+        """
+        self.control_ao_task('close')
+        self._ao_rows = None
+        self._ao_rows_key = None
+        self._scan_line_buf = None
+
+    def _setup_ao_task(self, ao_channels: Dict[str, int], daq_rate: Union[int, float],
+                       samps_per_line: int) -> None:
+        """Create and configure the AO task used to scan lines, unless the existing task
+        already has the same channels and timing.
+
+        Args:
+            ao_channels: Dict of {axis_name: ao_index} for the scanner ao channels.
+            daq_rate: DAQ sampling rate in Hz.
+            samps_per_line: Number of samples per channel written for each line.
+        """
+        #: control_ao_task('stop') also unreserves the task, so goto can use the AOs between lines.
+        task_config = (tuple(ao_channels.items()), daq_rate, samps_per_line)
+        if self.ao_task is not None and task_config == self._ao_task_config:
+            return
+        self.control_ao_task('close')
+        daq_name = self.metadata['daq']['name']
+        self.ao_task = nidaqmx.Task('scan_line_ao_task')
+        for axis, idx in ao_channels.items():
+            self.ao_task.ao_channels.add_ao_voltage_chan('{}/ao{}'.format(daq_name, idx), axis)
+        self.ao_task.timing.cfg_samp_clk_timing(daq_rate,
+                                                sample_mode=AcquisitionType.FINITE,
+                                                samps_per_chan=samps_per_line)
+        self._ao_writer = AnalogMultiChannelWriter(self.ao_task.out_stream, auto_start=False)
+        self._ao_task_config = task_config
+        #: prepare_scan() creates the task before the scan's gotos, so make sure
+        #: it doesn't hold the AOs until the first line is started.
+        self.ao_task.control(TaskMode.TASK_UNRESERVE)
+
     def scan_line(self, scan_grids: Dict[str, np.ndarray], ao_channels: Dict[str, int],
                   daq_rate: Union[int, float], counter: Any, reverse=False) -> None:
         """Scan a single line of a plane.
@@ -206,24 +316,20 @@ class Scanner(Instrument):
             counter: utils.Counter instance, determines current line of the grid.
             reverse: Determines scan direction (i.e. forward or backward).
         """
-        daq_name = self.metadata['daq']['name']
-        self.ao_task = nidaqmx.Task('scan_line_ao_task')
-        out = []
         line = counter.count
+        if (self._ao_rows_key is None or self._ao_rows_key[0] is not scan_grids
+                or self._ao_rows_key[1] != tuple(ao_channels)):
+            self.prepare_scan(scan_grids, ao_channels)
+        out = self._ao_rows[line]
         if reverse:
-            step = -1
-            last_point = 0
-        else:
-            step = 1
-            last_point = -1
-        for axis, idx in ao_channels.items():
-            out.append(scan_grids[axis][line][::step])
-            self.ao_task.ao_channels.add_ao_voltage_chan('{}/ao{}'.format(daq_name, idx), axis)
-        self.ao_task.timing.cfg_samp_clk_timing(daq_rate,
-                                                sample_mode=AcquisitionType.FINITE,
-                                                samps_per_chan=len(out[0]))
-        log.debug('Writing line {}.'.format(line))
-        self.ao_task.write(np.array(out), auto_start=False)
+            #: Reversed rows are strided views, so copy them into the contiguous buffer.
+            #: The writer copies the samples into the DAQ buffer, so it can be reused every line.
+            np.copyto(self._scan_line_buf, out[:, ::-1])
+            out = self._scan_line_buf
+        #: No-op if prepare_scan() already created the task for this scan
+        self._setup_ao_task(ao_channels, daq_rate, out.shape[1])
+        log.debug('Writing line %s.', line)
+        self._ao_writer.write_many_sample(out)
         
     def goto_start_of_next_line(self, scan_grids: Dict[str, np.ndarray], counter: Any) -> None:
         """Moves scanner to the start of the next line to scan.
@@ -233,12 +339,11 @@ class Scanner(Instrument):
             counter: utils.Counter instance, determines current line of the grid.
         """
         line = counter.count
-        try:
-            start_of_next_line = [scan_grids[axis][line+1][0] for axis in ['x', 'y', 'z']]
-            self.goto(start_of_next_line, quiet=True)
         #: If `line` is the last line in the scan, do nothing.
-        except IndexError:
-            pass
+        if line + 1 >= scan_grids['x'].shape[0]:
+            return
+        start_of_next_line = [scan_grids[axis][line+1, 0] for axis in _AXES]
+        self.goto(start_of_next_line, quiet=True)
 
     def check_for_td(self, tdc_plot: Any, data_set: Any, counter: Any) -> None:
         """Check whether touchdown has occurred during a capacitive touchdown.
@@ -267,6 +372,8 @@ class Scanner(Instrument):
         #: Maximum allowed |d(capacitance)/d(voltage)|
         max_slope = self.Q_(tdc_plot.constants['max_slope']).to('{}/V'.format(cap_unit)).magnitude
         prefactor = self.Q_(tdc_plot.prefactors['CAP'])
+        #: CAP_lockin rails at 5 V, i.e. at |capacitance| = 5 V * |prefactor|
+        rail_cap = (self.Q_('5 V') * abs(prefactor)).to(cap_unit).magnitude
         #: Minimum number of points to fit per line
         nfitmin = tdc_plot.constants['nfitmin']
         #: Width of window used to determine if touchdown has occurred
@@ -279,11 +386,13 @@ class Scanner(Instrument):
         hdata = tdc_plot.hdata
         #: Some safety checks:
         if pt > 1:
-            if any(abs(cdata[pt-i] - initial_cap) > max_deltaC for i in range(2)):
+            #: Compare magnitudes in cap_unit, rather than building Quantities for every point
+            recent_cap = (cdata[pt], cdata[pt-1])
+            if any(abs(cap - initial_cap) > max_deltaC for cap in recent_cap):
                 log.warning('Capacitance bridge is too unbalanced to continue.')
                 self.break_loop = True
                 return
-            if any(abs(cdata[pt-i] * self.ureg(cap_unit)/prefactor) > self.Q_('5 V') for i in range(2)):
+            if any(abs(cap) > rail_cap for cap in recent_cap):
                 log.warning('CAP_lockin is railing.')
                 self.break_loop = True
                 return
@@ -291,21 +400,17 @@ class Scanner(Instrument):
         #: fit a line to each subset, and repeat for next partition
         #: Touchdown point is the partition point that minimizes the sum of squared residuals
         if pt > nwindow:
-            #: index of partition boundary corresponding to minimum rms residual
-            imin = - nwindow + nfitmin 
-            rmsmin = np.inf
-            for i in range(-nwindow + nfitmin, -nfitmin):
-                p0, rms0 = utils.fit_line(hdata[-nwindow:i+1], cdata[-nwindow:i+1])
-                p1, rms1 = utils.fit_line(hdata[i:], cdata[i:])
-                rms = rms0 + rms1
-                if rms < rmsmin:
-                    imin = i
-                    rmsmin = rms
-            #: Get the slope of the two lines that minimize rms residual
+            #: index of partition boundary corresponding to minimum rms residual,
+            #: and the two lines fit on either side of it
+            split = utils.find_td_split(hdata[-nwindow:], cdata[-nwindow:], nfitmin)
+            if split is None:
+                imin = - nwindow + nfitmin
+                p0, _ = utils.fit_line(hdata[-nwindow:imin+1], cdata[-nwindow:imin+1])
+                p1, _ = utils.fit_line(hdata[imin:], cdata[imin:])
+            else:
+                imin, p0, p1 = split
             x0 = hdata[-nwindow:imin+1]
-            p0, _ = utils.fit_line(x0, cdata[-nwindow:imin+1])
             x1 = hdata[imin:]
-            p1, _ = utils.fit_line(x1, cdata[imin:])
             tdc_plot.ax[0].plot(x0, p0[0] * x0 + p0[1], 'r-')
             tdc_plot.ax[0].plot(x1, p1[0] * x1 + p1[1], 'r-')
             tdc_plot.fig.canvas.draw()
@@ -337,18 +442,14 @@ class Scanner(Instrument):
             #: Partition data in window into two subsets,
             #: fit a line to each subset, and repeat for next partition.
             #: Touchdown point is the partition point that minimizes the sum of squared residuals
-            imin = -ntest
-            rmsmin = np.inf
-            for i in range(-nwindow + ntest, -ntest):
-                p0, rms0 = utils.fit_line(hdata[-nwindow:i+1], cdata[-nwindow:i+1])
-                p1, rms1 = utils.fit_line(hdata[i:], cdata[i:])
-                rms = rms0 + rms1
-                if rms < rmsmin:
-                    imin = i
-                    rmsmin = rms
             #: Get the slope of the two lines that minimize rms residual
-            p0, _ = utils.fit_line(hdata[-nwindow:imin+1], cdata[-nwindow:imin+1])
-            p1, _ = utils.fit_line(hdata[imin:], cdata[imin:])
+            split = utils.find_td_split(hdata[-nwindow:], cdata[-nwindow:], ntest)
+            if split is None:
+                imin = -ntest
+                p0, _ = utils.fit_line(hdata[-nwindow:imin+1], cdata[-nwindow:imin+1])
+                p1, _ = utils.fit_line(hdata[imin:], cdata[imin:])
+            else:
+                imin, p0, p1 = split
             self.td_height = (p1[1]-p0[1]) / (p0[0] - p1[0])
             tdc_plot.td_height = self.td_height
             tdc_plot.pre_td_slope = '{} {}/V'.format(p0[0], cap_unit)
@@ -356,8 +457,8 @@ class Scanner(Instrument):
             utils.clear_artists(tdc_plot.ax[0])
             tdc_plot.ax[0].plot(hdata, cdata, 'b.')
             tdc_plot.ax[0].plot(hdata[-1], cdata[-1], 'r.')
-            tdc_plot.ax[0].plot(hdata[-nwindow:i+3], hdata[-nwindow:i+3] * p0[0] + p0[1], 'r-')
-            tdc_plot.ax[0].plot(hdata[i-2:], hdata[i-2:] * p1[0] + p1[1], 'r-')
+            tdc_plot.ax[0].plot(hdata[-nwindow:imin+3], hdata[-nwindow:imin+3] * p0[0] + p0[1], 'r-')
+            tdc_plot.ax[0].plot(hdata[imin-2:], hdata[imin-2:] * p1[0] + p1[1], 'r-')
             tdc_plot.ax[0].set_title('Touchdown: {:.4} V'.format(self.td_height))
             tdc_plot.fig.canvas.draw()
             tdc_plot.fig.show()
@@ -403,6 +504,23 @@ class Scanner(Instrument):
             smooth = 0
         self.surface_interp = Rbf(surf['td_grid'][0][0][0], surf['td_grid'][0][0][1], surf['td_grid'][0][0][2], function=function, smooth=smooth)
 
+    def _close_ai_task(self) -> None:
+        """Close the AI task used by get_pos.
+        """
+        if self._ai_task is not None:
+            try:
+                self._ai_task.close()
+            finally:
+                self._ai_task = None
+
+    def close(self) -> None:
+        """Close the scanner's DAQ tasks, then the instrument.
+        """
+        if hasattr(self, '_ai_task'):
+            self._close_ai_task()
+            self.control_ao_task('close')
+        super().close()
+
     def clear_instances(self):
         """Clear scanner instances.
         """
@@ -414,10 +532,23 @@ class Scanner(Instrument):
 
         Args:
             cmd: What you want the Task to do. For example,
-                self.control_ao_task('stop') is equivalent to self.ao_task.stop()
+                self.control_ao_task('stop') is equivalent to self.ao_task.stop().
+                'stop' also unreserves the task, so that goto can use the AOs.
         """
-        if hasattr(self, 'ao_task'):
+        if self.ao_task is None:
+            return
+        try:
             getattr(self.ao_task, cmd)()
+            if cmd == 'stop':
+                #: A task that was written to before it was started can stay committed
+                #: after stop(), and keep the AOs reserved.
+                self.ao_task.control(TaskMode.TASK_UNRESERVE)
+        finally:
+            #: Forget a closed task even if closing it raised, so that a new one is created.
+            if cmd == 'close':
+                self.ao_task = None
+                self._ao_task_config = None
+                self._ao_writer = None
 
     def make_ramp(self, pos0: List, pos1: List, speed: Union[int, float]) -> np.ndarray:
         """Generates a ramp in x,y,z scanner voltage from point pos0 to point pos1 at given speed.
@@ -431,27 +562,48 @@ class Scanner(Instrument):
                 Array of x, y, z values to write to DAQ AOs to move
                 scanner from pos0 to pos1.
         """
-        if speed > self.speed.to('V/s').magnitude:
+        if speed > self._speed_V_s:
             msg = 'Setting ramp speed to maximum allowed: {} V/s.'
-            log.warning(msg.format(self.speed.to('V/s').magnitude))
-        pos0 = np.array(pos0)
-        pos1 = np.array(pos1)
+            log.warning(msg.format(self._speed_V_s))
+        pos0 = np.asarray(pos0, dtype=np.float64)
+        pos1 = np.asarray(pos1, dtype=np.float64)
         max_ramp_distance = np.max(np.abs(pos1-pos0))
         ramp_time = max_ramp_distance/speed
         npts = int(ramp_time * self.daq_rate) + 2
-        ramp = []
-        for i in range(3):
-            ramp.append(np.linspace(pos0[i], pos1[i], npts))
-        return np.array(ramp)
+        #: Short moves (e.g. between adjacent points) are just the two endpoints.
+        if npts == 2:
+            return np.stack([pos0, pos1], axis=1)
+        #: Broadcast one linspace over all three axes: a C-contiguous (3, npts) float64 array.
+        t = np.linspace(0.0, 1.0, npts)
+        ramp = pos0[:, None] + (pos1 - pos0)[:, None] * t
+        #: End exactly at pos1, as np.linspace(pos0[i], pos1[i], npts) did.
+        ramp[:, -1] = pos1
+        return ramp
     
+    def goto_axis(self, axis: str, value: float, current_pos: Optional[List[float]]=None,
+                  quiet: Optional[bool]=True) -> None:
+        """Go to given position along one axis, leaving the other two axes where they are.
+
+        Args:
+            axis: 'x', 'y', or 'z'.
+            value: Position to go to along axis, in DAQ voltage.
+            current_pos: Current [x, y, z] scanner voltage, if it is already known
+                (e.g. when moving several axes in sequence). Default: None (read from the DAQ).
+            quiet: If True, only logs changes in logging.DEBUG mode. Default: True.
+        """
+        if current_pos is None:
+            current_pos = self.get_pos()
+        new_pos = list(current_pos)
+        new_pos[_AXES.index(axis)] = value
+        self.goto(new_pos, quiet=quiet)
+
     def _goto_x(self, xpos: float) -> None:
         """Go to given x position.
 
         Args:
             xpos: x position to go to, in DAQ voltage.
         """
-        current_pos = self.get_pos() 
-        self.goto([xpos, current_pos[1], current_pos[2]], quiet=True)
+        self.goto_axis('x', xpos)
         
     def _goto_y(self, ypos: float) -> None:
         """Go to given y position.
@@ -459,8 +611,7 @@ class Scanner(Instrument):
         Args:
             ypos: y position to go to, in DAQ voltage.
         """
-        current_pos = self.position()
-        self.goto([current_pos[0], ypos, current_pos[2]], quiet=True)
+        self.goto_axis('y', ypos)
     
     def _goto_z(self, zpos: float) -> None:
         """Go to given z position.
@@ -468,5 +619,4 @@ class Scanner(Instrument):
         Args:
             zpos: z position to go to, in DAQ voltage.
         """
-        current_pos = self.position()
-        self.goto([current_pos[0], current_pos[1], zpos], quiet=True)
+        self.goto_axis('z', zpos)
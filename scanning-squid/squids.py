@@ -76,3 +76,6 @@ class Dispersive(SQUID):
             **kwargs: Keyword arguments passed to Instrument constructor.
         """
         super().__init__(squid_config, **kwargs)
+
+#: {squid_type: SQUID subclass}, used to look up the SQUID type given in the microscope configuration
+REGISTRY = {cls.__name__.lower(): cls for cls in (Susceptometer, Sampler, Dispersive)}
@@ -0,0 +1,69 @@
+"""Regression tests for utils.find_td_split, which replaced the loop over
+utils.fit_line used by Scanner.check_for_td and Scanner.get_td_height.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+#: scanning-squid modules import each other as top-level modules (e.g. `import utils`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
+
+def fit_line_split(h, c, nfit):
+    """The split point search as it was written in Scanner.check_for_td."""
+    nwindow = len(h)
+    imin = -nwindow + nfit
+    rmsmin = np.inf
+    for i in range(-nwindow + nfit, -nfit):
+        p0, rms0 = utils.fit_line(h[-nwindow:i+1], c[-nwindow:i+1])
+        p1, rms1 = utils.fit_line(h[i:], c[i:])
+        rms = rms0 + rms1
+        if rms < rmsmin:
+            imin = i
+            rmsmin = rms
+    p0, _ = utils.fit_line(h[-nwindow:imin+1], c[-nwindow:imin+1])
+    p1, _ = utils.fit_line(h[imin:], c[imin:])
+    return imin, p0, p1
+
+
+def touchdown_data(seed):
+    """Simulated touchdown: capacitance vs. height with a change in slope plus noise."""
+    rng = np.random.RandomState(seed)
+    n = rng.randint(20, 120)
+    nfit = rng.randint(2, n // 3)
+    h = np.linspace(2, 7, n)
+    td = rng.randint(0, n)
+    c = np.where(np.arange(n) < td, 0.01 * h, 0.5 * h) + rng.normal(0, 1e-3, n) + 1
+    return h, c, nfit
+
+
+@pytest.fixture(params=['numpy', 'numba'])
+def split_path(request, monkeypatch):
+    if request.param == 'numpy':
+        #: As if numba weren't installed
+        monkeypatch.setattr(utils, '_td_split_jit', False)
+    elif utils._get_td_split_kernel() is None:
+        pytest.skip('numba is not installed')
+    return request.param
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_matches_fit_line_loop(split_path, seed):
+    h, c, nfit = touchdown_data(seed)
+    imin, p0, p1 = utils.find_td_split(h, c, nfit)
+    expected_imin, expected_p0, expected_p1 = fit_line_split(h, c, nfit)
+    assert imin == expected_imin
+    np.testing.assert_allclose(p0, expected_p0, rtol=0, atol=1e-8)
+    np.testing.assert_allclose(p1, expected_p1, rtol=0, atol=1e-8)
+
+
+def test_no_valid_split(split_path):
+    #: Constant heights: no segment has a valid line fit
+    h = np.ones(30)
+    c = np.linspace(0, 1, 30)
+    assert utils.find_td_split(h, c, 5) is None
+    #: Window too short for two segments of nfit points
+    assert utils.find_td_split(np.arange(8.0), np.arange(8.0), 5) is None
@@ -0,0 +1,31 @@
+"""Tests for the response parsing in instruments.heater.EL320P."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+#: scanning-squid modules import each other as top-level modules (e.g. `import utils`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip('qcodes')
+pytest.importorskip('visa')
+from instruments.heater import EL320P
+
+
+def test_get_parser():
+    assert EL320P._get_parser('V 12.00') == 12.0
+    assert EL320P._get_parser('IO 0.150A') == 0.15
+    with pytest.raises(ValueError, match='VO'):
+        EL320P._get_parser('VO')
+
+
+def test_parse_many():
+    responses = ['V 12.00', 'VO 11.98V', 'I 1.5e-1', 'IO .149A']
+    np.testing.assert_array_equal(EL320P.parse_many(responses), [12.0, 11.98, 0.15, 0.149])
+    assert EL320P.parse_many([]).shape == (0,)
+
+
+def test_parse_many_one_value_per_response():
+    #: A response without a number must not shift the remaining values
+    with pytest.raises(ValueError, match='ERR'):
+        EL320P.parse_many(['V 12.00', 'ERR', 'V 11.00'])
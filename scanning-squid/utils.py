@@ -30,10 +30,27 @@ from scipy import io
 from collections import OrderedDict
 import json
 
-#: Tell the UnitRegistry what a Phi0 is, and that ohm and Ohm are the same thing.
-with open('squid_units.txt', 'w') as f:
-    f.write('Phi0 = 2.067833831e-15 * Wb\n')
-    f.write('Ohm = ohm\n')
+#: Units used by scanning-squid that pint doesn't define by default
+SQUID_UNITS = ['Phi0 = 2.067833831e-15 * Wb', 'Ohm = ohm']
+
+def define_squid_units(ureg: Any) -> Any:
+    """Tells a pint UnitRegistry what a Phi0 is, and that ohm and Ohm are the same thing.
+    Safe to call more than once on the same UnitRegistry.
+
+    Args:
+        ureg: pint UnitRegistry.
+
+    Returns:
+        UnitRegistry: ureg
+            The same UnitRegistry, with SQUID_UNITS defined.
+    """
+    from pint.errors import RedefinitionError
+    for definition in SQUID_UNITS:
+        try:
+            ureg.define(definition)
+        except RedefinitionError:
+            pass
+    return ureg
 
 class Counter(object):
     """Simple counter used to keep track of progress in a Loop.
@@ -98,6 +115,32 @@ def make_scan_vectors(scan_params: Dict[str, Any], ureg: Any) -> Dict[str, Seque
     y = np.linspace(center[1] - 0.5 * rng[1], center[1] + 0.5 * rng[1], size[1])
     return {'x': x, 'y': y}
 
+def make_td_heights(tdc_params: Dict[str, Any], ureg: Any) -> np.ndarray:
+    """Creates the vector of z positions swept during a capacitive touchdown.
+
+    Args:
+        tdc_params: Touchdown parameter dict.
+        ureg: pint UnitRegistry, manages units.
+
+    Returns:
+        np.ndarray: heights
+            z positions (in DAQ voltage) from min(tdc_params['range']) to
+            max(tdc_params['range']) in steps of tdc_params['dV'].
+
+    Raises:
+        ValueError if tdc_params['range'] is not a whole number of steps of tdc_params['dV'].
+    """
+    Q_ = ureg.Quantity
+    dV = Q_(tdc_params['dV']).to('V').magnitude
+    startV, endV = sorted([Q_(lim).to('V').magnitude for lim in tdc_params['range']])
+    #: Round to absorb floating point error in (endV - startV) / dV, but don't silently
+    #: change the step size if the range really isn't a multiple of dV.
+    steps = int(round((endV - startV) / dV))
+    if abs(steps * dV - (endV - startV)) > 1e-6 * dV:
+        msg = 'Touchdown range {} is not a whole number of steps of dV = {}.'
+        raise ValueError(msg.format(tdc_params['range'], tdc_params['dV']))
+    return np.linspace(startV, endV, steps + 1, dtype=np.float64)
+
 def make_scan_grids(scan_vectors: Dict[str, Sequence[float]], slow_ax: str,
                     fast_ax: str, fast_ax_pts: int, plane: Dict[str, float],
                     height: float) -> Dict[str, Any]:
@@ -114,7 +157,9 @@ def make_scan_grids(scan_vectors: Dict[str, Sequence[float]], slow_ax: str,
 
     Returns:
         Dict: scan_grids
-            {axis_name: axis_scan_grid} for x, y, z, axes.
+            {axis_name: axis_scan_grid} for x, y, z, axes. Each grid is a C-contiguous
+            array of shape (len(scan_vectors[slow_ax]), fast_ax_pts), so scan_grids[axis][line]
+            is a contiguous view of the points written to the DAQ for a given line.
     """
     slow_ax_vec = scan_vectors[slow_ax]
     fast_ax_vec = np.linspace(scan_vectors[fast_ax][0],
@@ -125,7 +170,7 @@ def make_scan_grids(scan_vectors: Dict[str, Sequence[float]], slow_ax: str,
     else:
         X, Y = np.meshgrid(fast_ax_vec, slow_ax_vec, indexing='xy')
     Z = X * plane['x'] + Y * plane['y'] + plane['z'] + height
-    return {'x': X, 'y': Y, 'z': Z}
+    return {ax: np.ascontiguousarray(grid, dtype=np.float64) for ax, grid in zip(['x', 'y', 'z'], [X, Y, Z])}
 
 def make_scan_surface(surface_type: str, scan_vectors: Dict[str, Sequence[float]], slow_ax: str,
                     fast_ax: str, fast_ax_pts: int, plane: Dict[str, float], height: float,
@@ -146,7 +191,7 @@ def make_scan_surface(surface_type: str, scan_vectors: Dict[str, Sequence[float]
 
     Returns:
         Dict: scan_grids
-            {axis_name: axis_scan_grid} for x, y, z, axes.
+            {axis_name: axis_scan_grid} for x, y, z, axes (see make_scan_grids).
     """
     if surface_type.lower() not in ['plane', 'surface']:
         raise ValueError('surface_type must be "plane" or "surface".')
@@ -159,7 +204,8 @@ def make_scan_surface(surface_type: str, scan_vectors: Dict[str, Sequence[float]
             msg += '(namely microscope.scanner.surface_interp).'
             raise ValueError(msg)
         Z = interpolator(plane_grids['x'], plane_grids['y'])
-        surface_grids = {'x': plane_grids['x'], 'y': plane_grids['y'], 'z': Z + height}
+        surface_grids = {'x': plane_grids['x'], 'y': plane_grids['y'],
+                         'z': np.ascontiguousarray(Z + height, dtype=np.float64)}
         return surface_grids
 
 def make_xy_grids(scan_vectors: Dict[str, Sequence[float]], slow_ax: str,
@@ -231,8 +277,7 @@ def to_real_units(data_set: Any, ureg: Any=None) -> Any:
     """
     if ureg is None:
         from pint import UnitRegistry
-        ureg = UnitRegistry()
-        ureg.load_definitions('./squid_units.txt')
+        ureg = define_squid_units(UnitRegistry())
     meta = data_set.metadata['loop']['metadata']
     data = np.full_like(data_set.daq_ai_voltage, np.nan, dtype=np.double)
     for i, ch in enumerate(meta['channels'].keys()):
@@ -260,12 +305,7 @@ def scan_to_arrays(scan_data: Any, ureg: Optional[Any]=None, real_units: Optiona
     """
     if ureg is None:
         from pint import UnitRegistry
-        ureg = UnitRegistry()
-        #: Tell the UnitRegistry what a Phi0 is, and that ohm and Ohm are the same thing.
-        with open('squid_units.txt', 'w') as f:
-            f.write('Phi0 = 2.067833831e-15 * Wb\n')
-            f.write('Ohm = ohm\n')
-        ureg.load_definitions('./squid_units.txt')
+        ureg = define_squid_units(UnitRegistry())
     Q_ = ureg.Quantity
     meta = scan_data.metadata['loop']['metadata']
     scan_vectors = make_scan_vectors(meta, ureg)
@@ -302,17 +342,10 @@ def td_to_arrays(td_data: Any, ureg: Optional[Any]=None, real_units: Optional[bo
     """
     if ureg is None:
         from pint import UnitRegistry
-        ureg = UnitRegistry()
-        #: Tell the UnitRegistry what a Phi0 is, and that ohm and Ohm are the same thing.
-        with open('squid_units.txt', 'w') as f:
-            f.write('Phi0 = 2.067833831e-15 * Wb\n')
-            f.write('Ohm = ohm\n')
-        ureg.load_definitions('./squid_units.txt')
+        ureg = define_squid_units(UnitRegistry())
     Q_ = ureg.Quantity
     meta = td_data.metadata['loop']['metadata']
-    h = [Q_(val).to('V').magnitude for val in meta['range']]
-    dV = Q_(meta['dV']).to('V').magnitude
-    heights = np.linspace(h[0], h[1], int((h[1]-h[0])/dV))
+    heights = make_td_heights(meta, ureg)
     arrays = {'height': heights * ureg('V')}
     for ch, info in meta['channels'].items():
         array = td_data.daq_ai_voltage[:,info['idx'],0] * ureg('V')
@@ -340,8 +373,7 @@ def scan_to_mat_file(scan_data: Any, real_units: Optional[bool]=True, xy_unit: O
             Default: None.
     """
     from pint import UnitRegistry
-    ureg = UnitRegistry()
-    ureg.load_definitions('./squid_units.txt')
+    ureg = define_squid_units(UnitRegistry())
     Q_ = ureg.Quantity
     meta = scan_data.metadata['loop']['metadata']
     arrays = scan_to_arrays(scan_data, ureg=ureg, real_units=real_units, xy_unit=xy_unit)
@@ -378,8 +410,7 @@ def td_to_mat_file(td_data: Any, real_units: Optional[bool]=True, fname: Optiona
             If None, uses the file name defined in measurement configuration file.
     """
     from pint import UnitRegistry
-    ureg = UnitRegistry()
-    ureg.load_definitions('./squid_units.txt')
+    ureg = define_squid_units(UnitRegistry())
     Q_ = ureg.Quantity
     meta = td_data.metadata['loop']['metadata']
     arrays = td_to_arrays(td_data, ureg=ureg, real_units=real_units)
@@ -436,6 +467,156 @@ def fit_line(x: Union[list, np.ndarray], y: Union[list, np.ndarray]) -> Tuple[np
     rms = np.sqrt(np.mean(np.square(residuals)))
     return p, rms
 
+def _line_ssr(sx: float, sy: float, sxx: float, sxy: float, syy: float, n: int) -> float:
+    """Sum of squared residuals of a least-squares line fit, given the sums over one segment
+    (see _segment_ssr). Returns NaN if x is constant in the segment.
+    """
+    var_x = sxx - sx * sx / n
+    if not var_x > 0:
+        return np.nan
+    cov_xy = sxy - sx * sy / n
+    return max(syy - sy * sy / n - cov_xy * cov_xy / var_x, 0.0)
+
+def _td_split_kernel(x: np.ndarray, y: np.ndarray, nfit: int) -> Tuple[int, np.ndarray]:
+    """Loop version of the split point search in find_td_split, compiled with numba if available
+    (see _get_td_split_kernel).
+
+    Args:
+        x: Mean-subtracted heights.
+        y: Mean-subtracted capacitance data, same length as x.
+        nfit: Minimum number of points in each segment.
+    Returns:
+        Tuple[int, numpy.ndarray]: j, sums
+            Index (from the start of x) of the split point, or -1 if no split point has a valid fit,
+            and the cumulative sums of [x, y, x**2, x*y, y**2], shape (5, len(x) + 1).
+    """
+    n = x.shape[0]
+    sums = np.zeros((5, n + 1))
+    for k in range(n):
+        sums[0, k + 1] = sums[0, k] + x[k]
+        sums[1, k + 1] = sums[1, k] + y[k]
+        sums[2, k + 1] = sums[2, k] + x[k] * x[k]
+        sums[3, k + 1] = sums[3, k] + x[k] * y[k]
+        sums[4, k + 1] = sums[4, k] + y[k] * y[k]
+    jmin = -1
+    ssrmin = np.inf
+    for j in range(nfit, n - nfit):
+        ssr = (_line_ssr(sums[0, j + 1], sums[1, j + 1], sums[2, j + 1],
+                         sums[3, j + 1], sums[4, j + 1], j + 1) +
+               _line_ssr(sums[0, n] - sums[0, j], sums[1, n] - sums[1, j], sums[2, n] - sums[2, j],
+                         sums[3, n] - sums[3, j], sums[4, n] - sums[4, j], n - j))
+        #: NaN (no valid fit) never compares less, as with np.nanargmin in find_td_split
+        if ssr < ssrmin:
+            jmin = j
+            ssrmin = ssr
+    return jmin, sums
+
+#: numba-compiled _td_split_kernel: None until the first call to find_td_split,
+#: False if numba isn't installed.
+_td_split_jit = None
+
+def _get_td_split_kernel() -> Optional[Callable]:
+    """Compiles _td_split_kernel with numba (which is optional) the first time it's needed,
+    rather than when utils is imported, since importing numba takes a sizeable fraction of a second.
+
+    Returns:
+        Optional[Callable]: kernel
+            The compiled _td_split_kernel, or None if numba isn't installed.
+    """
+    global _td_split_jit, _line_ssr
+    if _td_split_jit is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _td_split_jit = False
+        else:
+            #: The kernel calls _line_ssr, which must be compiled too
+            _line_ssr = njit(cache=True)(_line_ssr)
+            _td_split_jit = njit(cache=True)(_td_split_kernel)
+    return _td_split_jit or None
+
+def _segment_ssr(sums: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Sum of squared residuals of least-squares line fits, given the sums over each segment.
+
+    Args:
+        sums: Array of [sum(x), sum(y), sum(x**2), sum(x*y), sum(y**2)] for each segment.
+        n: Number of points in each segment.
+    Returns:
+        numpy.ndarray: ssr
+            Sum of squared residuals for each segment (NaN if x is constant in the segment).
+    """
+    sx, sy, sxx, sxy, syy = sums
+    var_x = sxx - sx * sx / n
+    cov_xy = sxy - sx * sy / n
+    var_y = syy - sy * sy / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ssr = var_y - cov_xy * cov_xy / var_x
+    ssr[~(var_x > 0)] = np.nan
+    return np.maximum(ssr, 0)
+
+def _segment_fit(sums: np.ndarray, n: int, x0: float, y0: float) -> np.ndarray:
+    """Least-squares line fit to one segment, given the sums over the segment (see _segment_ssr).
+
+    Args:
+        sums: Array of [sum(x), sum(y), sum(x**2), sum(x*y), sum(y**2)] over the segment,
+            where x = h - x0 and y = c - y0.
+        n: Number of points in the segment.
+        x0: Offset subtracted from h.
+        y0: Offset subtracted from c.
+    Returns:
+        numpy.ndarray: p
+            [slope, intercept] of the line c = slope * h + intercept, as returned by utils.fit_line.
+    """
+    sx, sy, sxx, sxy, _ = sums
+    slope = (sxy - sx * sy / n) / (sxx - sx * sx / n)
+    intercept = (sy - slope * sx) / n + y0 - slope * x0
+    return np.array([slope, intercept])
+
+def find_td_split(h: np.ndarray, c: np.ndarray,
+                  nfit: int) -> Optional[Tuple[int, np.ndarray, np.ndarray]]:
+    """Splits h, c into two segments that share one point, each with at least nfit points,
+    such that the total sum of squared residuals of a line fit to each segment is minimized.
+    Equivalent to calling fit_line on both segments for every split point, but uses
+    cumulative sums so that all split points are evaluated in a single pass.
+
+    Args:
+        h: Array of heights (in DAQ voltage).
+        c: Array of capacitance data, same length as h.
+        nfit: Minimum number of points in each segment.
+    Returns:
+        Optional[Tuple[int, numpy.ndarray, numpy.ndarray]]: i, p0, p1
+            Index (negative, i.e. counted from the end of h) of the split point,
+            and the [slope, intercept] of the lines fit to the segments h[:i+1] and h[i:],
+            computed from the same sums. None if no split point has a valid fit.
+    """
+    n = len(h)
+    #: Subtract the means so that the sums are well-conditioned
+    x = np.asarray(h, dtype=np.float64)
+    x0 = x.mean()
+    x = x - x0
+    y = np.asarray(c, dtype=np.float64)
+    y0 = y.mean()
+    y = y - y0
+    kernel = _get_td_split_kernel()
+    if kernel is not None:
+        jmin, sums = kernel(x, y, nfit)
+        if jmin < 0:
+            return None
+    else:
+        sums = np.zeros((5, n + 1))
+        np.cumsum([x, y, x * x, x * y, y * y], axis=1, out=sums[:, 1:])
+        #: Split points, as indices from the start of h
+        j = np.arange(nfit, n - nfit)
+        if not len(j):
+            return None
+        ssr = _segment_ssr(sums[:, j + 1], j + 1) + _segment_ssr(sums[:, n:] - sums[:, j], n - j)
+        if np.isnan(ssr).all():
+            return None
+        jmin = int(j[np.nanargmin(ssr)])
+    p0 = _segment_fit(sums[:, jmin + 1], jmin + 1, x0, y0)
+    p1 = _segment_fit(sums[:, n] - sums[:, jmin], n - jmin, x0, y0)
+    return int(jmin - n), p0, p1
+
 def clear_artists(ax):
     for artist in ax.lines + ax.collections:
         artist.remove()